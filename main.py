@@ -2,22 +2,36 @@
 from __future__ import annotations
 
 import argparse
+import contextlib
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
 from pathlib import Path
-from typing import TextIO
+from typing import IO, BinaryIO
 
-from textile2bbcode.converter import convert
+from textile2bbcode import converter
+from textile2bbcode.converter import TextSink, convert_to
 
+IO_BUFFER_SIZE = 1 << 20
+CACHE_MAX_ENTRIES = 64
+# Исходник, а не ``converter.__file__``: у mypyc-сборки это .so-прослойка,
+# которая не меняется при пересборке.
+CONVERTER_SOURCE = Path(converter.__file__).with_name("converter.py")
 
-def _read_text(stream: TextIO) -> str:
-    """Считывает весь текст из переданного потока."""
 
-    return stream.read()
+def _read_text(stream: BinaryIO) -> str:
+    """Считывает весь файл одним чтением и декодирует его из UTF-8.
 
+    Переводы строк приводятся к ``\n`` так же, как при чтении в текстовом
+    режиме.
+    """
 
-def _write_text(stream: TextIO, content: str) -> None:
-    """Записывает контент в поток вывода."""
-
-    stream.write(content)
+    text = stream.read().decode("utf-8")
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
 
 
 def _resolve_txt_output(input_path: Path, txt_output: Path | None) -> Path:
@@ -35,6 +49,161 @@ def _resolve_txt_output(input_path: Path, txt_output: Path | None) -> Path:
     return target
 
 
+def _cache_dir() -> Path:
+    """Возвращает каталог кэша результатов конвертации."""
+
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "textile2bbcode"
+
+
+def _cache_key(textile: str) -> str:
+    """Считает ключ кэша по исходному тексту и коду конвертера.
+
+    Код конвертера входит в ключ, чтобы после его изменения старые
+    результаты не использовались.
+    """
+
+    digest = hashlib.sha256(CONVERTER_SOURCE.read_bytes())
+    digest.update(textile.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class _CacheMirror:
+    """Пишет BBCode в целевой поток и одновременно во временный файл кэша.
+
+    Ошибка записи в кэш не прерывает основной вывод: зеркалирование просто
+    отключается, и такой файл кэша потом отбрасывается.
+    """
+
+    def __init__(self, target: TextSink, mirror: IO[str]) -> None:
+        self._target = target
+        self._mirror: IO[str] | None = mirror
+        self.intact = True
+
+    def write(self, text: str) -> int:
+        self._target.write(text)
+        if self._mirror is not None:
+            try:
+                self._mirror.write(text)
+            except OSError:
+                self._mirror = None
+                self.intact = False
+        return len(text)
+
+
+def _finish_cache_file(temp: IO[str], cache_path: Path, keep: bool) -> bool:
+    """Закрывает временный файл и атомарно переносит его в кэш либо удаляет.
+
+    Возвращает ``True``, если результат попал в кэш.
+    """
+
+    try:
+        temp.close()
+        if keep:
+            os.replace(temp.name, cache_path)
+            return True
+    except OSError:
+        pass
+    with contextlib.suppress(OSError):
+        os.unlink(temp.name)
+    return False
+
+
+def _prune_cache(directory: Path) -> None:
+    """Удаляет давно не использованные записи сверх ``CACHE_MAX_ENTRIES``."""
+
+    try:
+        entries = sorted(directory.glob("*.bbcode"), key=lambda path: path.stat().st_mtime)
+        for stale in entries[:-CACHE_MAX_ENTRIES]:
+            stale.unlink(missing_ok=True)
+    except OSError:
+        pass
+
+
+def _convert_and_cache(textile: str, target: TextSink, cache_path: Path) -> None:
+    """Конвертирует текст в поток, за тот же проход сохраняя результат в кэш."""
+
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        temp = tempfile.NamedTemporaryFile(
+            "w",
+            encoding="utf-8",
+            newline="",
+            dir=cache_path.parent,
+            suffix=".tmp",
+            delete=False,
+        )
+    except OSError:
+        convert_to(textile, target)
+        return
+
+    mirror = _CacheMirror(target, temp)
+    complete = False
+    try:
+        convert_to(textile, mirror)
+        complete = True
+    finally:
+        stored = _finish_cache_file(temp, cache_path, complete and mirror.intact)
+    if stored:
+        _prune_cache(cache_path.parent)
+
+
+def _write_result(textile: str, target: TextSink, cache_path: Path | None) -> None:
+    """Пишет BBCode в поток, беря готовый результат из кэша, если он есть."""
+
+    if cache_path is None:
+        convert_to(textile, target)
+        return
+
+    try:
+        cached = cache_path.open("r", encoding="utf-8", newline="")
+    except FileNotFoundError:
+        _convert_and_cache(textile, target, cache_path)
+        return
+    except OSError:
+        convert_to(textile, target)
+        return
+
+    with cached:
+        # Обновляем время изменения, чтобы запись считалась недавно использованной.
+        with contextlib.suppress(OSError):
+            os.utime(cache_path)
+        shutil.copyfileobj(cached, target)
+
+
+class _Utf8Sink:
+    """Кодирует BBCode в UTF-8 и пишет байты прямо в бинарный поток.
+
+    Переводы строк заменяются на ``os.linesep``, как это делает текстовый режим.
+    """
+
+    def __init__(self, buffer: BinaryIO) -> None:
+        self._buffer = buffer
+
+    def write(self, text: str) -> int:
+        if os.linesep != "\n":
+            text = text.replace("\n", os.linesep)
+        self._buffer.write(text.encode("utf-8"))
+        return len(text)
+
+
+def _write_stdout(textile: str, cache_path: Path | None) -> None:
+    """Пишет BBCode в stdout в UTF-8, не трогая сам ``sys.stdout``.
+
+    Байты идут в ``sys.stdout.buffer`` без промежуточной текстовой обёртки,
+    поэтому кодировка и состояние потока вызывающего кода не меняются.
+    """
+
+    buffer = getattr(sys.stdout, "buffer", None)
+    if buffer is None:
+        _write_result(textile, sys.stdout, cache_path)
+        return
+
+    sys.stdout.flush()
+    _write_result(textile, _Utf8Sink(buffer), cache_path)
+    buffer.flush()
+
+
 def _parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         description="Преобразует Textile-разметку в BBCode",
@@ -60,27 +229,38 @@ def _parse_args() -> argparse.Namespace:
             "Сохранить результат в TXT. Без аргумента файл появится рядом с входным"
         ),
     )
+    parser.add_argument(
+        "--cache",
+        dest="use_cache",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help=(
+            "Кэшировать результаты в ~/.cache/textile2bbcode (по умолчанию выключено)"
+        ),
+    )
     return parser.parse_args()
 
 
 def main() -> None:
     args = _parse_args()
 
-    with args.input.open("r", encoding="utf-8") as source:
+    with args.input.open("rb", buffering=IO_BUFFER_SIZE) as source:
         textile = _read_text(source)
 
-    bbcode = convert(textile)
+    cache_path: Path | None = None
+    if args.use_cache:
+        cache_path = _cache_dir() / f"{_cache_key(textile)}.bbcode"
 
     if args.output:
         args.output.parent.mkdir(parents=True, exist_ok=True)
-        with args.output.open("w", encoding="utf-8") as target:
-            _write_text(target, bbcode)
+        with args.output.open("w", encoding="utf-8", buffering=IO_BUFFER_SIZE) as target:
+            _write_result(textile, target, cache_path)
     elif args.txt_output is not None:
         txt_path = _resolve_txt_output(args.input, args.txt_output)
-        with txt_path.open("w", encoding="utf-8") as target:
-            _write_text(target, bbcode)
+        with txt_path.open("w", encoding="utf-8", buffering=IO_BUFFER_SIZE) as target:
+            _write_result(textile, target, cache_path)
     else:
-        _write_text(stream=open(1, "w", encoding="utf-8", closefd=False), content=bbcode)
+        _write_stdout(textile, cache_path)
 
 
 if __name__ == "__main__":
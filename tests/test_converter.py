@@ -1,6 +1,7 @@
 """Набор модульных тестов для конвертера Textile → BBCode."""
 from __future__ import annotations
 
+import io
 import sys
 from pathlib import Path
 import unittest
@@ -9,7 +10,7 @@ ROOT_DIR = Path(__file__).resolve().parents[1]
 if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
 
-from textile2bbcode.converter import convert
+from textile2bbcode.converter import convert, convert_to
 
 
 class ConvertTestCase(unittest.TestCase):
@@ -25,6 +26,19 @@ class ConvertTestCase(unittest.TestCase):
 
         self.assertEqual(convert("Используйте @print@"), "Используйте [code]print[/code]")
 
+    def test_inline_code_keeps_backslashes(self) -> None:
+        """Обратные слэши внутри инлайн-кода копируются без изменений."""
+
+        self.assertEqual(convert(r"Путь @C:\new\1@"), r"Путь [code]C:\new\1[/code]")
+
+    def test_inline_code_pairs_and_unpaired_marker(self) -> None:
+        """Несколько фрагментов разбираются по парам, непарный ``@`` остаётся."""
+
+        self.assertEqual(
+            convert("@a@ и @@ и @b@ user@host"),
+            "[code]a[/code] и [code][/code] и [code]b[/code] user@host",
+        )
+
     def test_code_block_with_language(self) -> None:
         """Блочный код сохраняет язык и экранирует вложенные теги."""
 
@@ -40,6 +54,21 @@ class ConvertTestCase(unittest.TestCase):
         )
         self.assertEqual(convert(source), expected)
 
+    def test_code_block_without_language(self) -> None:
+        """Блочный код без класса получает тег [code] без суффикса языка."""
+
+        source = "<pre><code>\nx = [1]\n</code></pre>"
+        expected = "\n".join(
+            [
+                "[CODE]",
+                "&#91;code&#93;",
+                "x = [1]",
+                "&#91;/code&#93;",
+                "[/CODE]",
+            ]
+        )
+        self.assertEqual(convert(source), expected)
+
     def test_nested_list_synchronization(self) -> None:
         """Списки корректно открываются и закрываются при смене уровней."""
 
@@ -66,6 +95,41 @@ class ConvertTestCase(unittest.TestCase):
         )
         self.assertEqual(convert(source), expected)
 
+    def test_splitlines_separators(self) -> None:
+        """Строки разделяются так же, как в ``str.splitlines``."""
+
+        self.assertEqual(
+            convert("* a\f* b\n\nh1. T\u2028h2. U\rтекст"),
+            "\n".join(
+                [
+                    "[list]",
+                    "[*]a",
+                    "[*]b",
+                    "[/list]",
+                    "[SIZE=18pt][B]T[/B][/SIZE]",
+                    "[SIZE=16pt][B]U[/B][/SIZE]",
+                    "текст",
+                ]
+            ),
+        )
+
+    def test_convert_to_matches_convert(self) -> None:
+        """Потоковая запись даёт тот же результат, что и ``convert``."""
+
+        source = "\n".join(
+            [
+                "h2. Раздел",
+                "* Пункт",
+                "  продолжение с @code@",
+                "** Вложенный",
+                "",
+                "Текст",
+            ]
+        )
+        buffer = io.StringIO()
+        convert_to(source, buffer)
+        self.assertEqual(buffer.getvalue(), convert(source))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,167 @@
+"""Тесты CLI-обёртки ``main.py``."""
+from __future__ import annotations
+
+import io
+import os
+import sys
+import tempfile
+from pathlib import Path
+import unittest
+from unittest import mock
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+import main
+from textile2bbcode.converter import convert
+
+SOURCE = "h1. Заголовок\n* Пункт с @code@\n"
+
+
+class CacheTestCase(unittest.TestCase):
+    """Проверяет кэширование результатов конвертации в CLI."""
+
+    def setUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.root = Path(temp_dir.name)
+        self.input_path = self.root / "вход.textile"
+        self.input_path.write_text(SOURCE, encoding="utf-8")
+        self.output_path = self.root / "выход.bbcode"
+        self.cache_home = self.root / "cache"
+        env = mock.patch.dict(os.environ, {"XDG_CACHE_HOME": str(self.cache_home)})
+        env.start()
+        self.addCleanup(env.stop)
+
+    def _run(self, *flags: str) -> str:
+        argv = ["main.py", str(self.input_path), "-o", str(self.output_path), *flags]
+        with mock.patch.object(sys, "argv", argv):
+            main.main()
+        return self.output_path.read_text(encoding="utf-8")
+
+    def _cache_files(self) -> list[Path]:
+        return sorted((self.cache_home / "textile2bbcode").glob("*"))
+
+    def test_cache_disabled_by_default(self) -> None:
+        """Без ``--cache`` и с ``--no-cache`` каталог кэша не создаётся."""
+
+        self.assertEqual(self._run(), convert(SOURCE))
+        self.assertEqual(self._run("--no-cache"), convert(SOURCE))
+        self.assertFalse(self.cache_home.exists())
+
+    def test_cache_miss_stores_result(self) -> None:
+        """При промахе результат пишется в вывод и сохраняется в кэш."""
+
+        self.assertEqual(self._run("--cache"), convert(SOURCE))
+        cache_path = main._cache_dir() / f"{main._cache_key(SOURCE)}.bbcode"
+        self.assertEqual(self._cache_files(), [cache_path])
+        self.assertEqual(cache_path.read_text(encoding="utf-8"), convert(SOURCE))
+
+    def test_cache_hit_uses_stored_result(self) -> None:
+        """При попадании вывод берётся из кэша без повторной конвертации."""
+
+        cache_path = main._cache_dir() / f"{main._cache_key(SOURCE)}.bbcode"
+        cache_path.parent.mkdir(parents=True)
+        cache_path.write_text("из кэша", encoding="utf-8")
+
+        with mock.patch.object(main, "convert_to") as convert_to:
+            self.assertEqual(self._run("--cache"), "из кэша")
+        convert_to.assert_not_called()
+
+    def test_converter_change_misses_cache(self) -> None:
+        """После изменения исходника конвертера старая запись кэша не используется."""
+
+        self._run("--cache")
+        changed_source = self.root / "converter.py"
+        changed_source.write_bytes(main.CONVERTER_SOURCE.read_bytes() + b"\n# changed\n")
+
+        with mock.patch.object(main, "CONVERTER_SOURCE", changed_source):
+            self.assertEqual(self._run("--cache"), convert(SOURCE))
+            cache_path = main._cache_dir() / f"{main._cache_key(SOURCE)}.bbcode"
+
+        self.assertEqual(len(self._cache_files()), 2)
+        self.assertIn(cache_path, self._cache_files())
+
+    def test_unwritable_cache_dir_falls_back(self) -> None:
+        """Если каталог кэша создать нельзя, конвертация всё равно выполняется."""
+
+        self.cache_home.write_text("не каталог", encoding="utf-8")
+
+        self.assertEqual(self._run("--cache"), convert(SOURCE))
+
+    def test_unreadable_cache_entry_falls_back(self) -> None:
+        """Если файл кэша не открывается, конвертация выполняется заново."""
+
+        cache_path = main._cache_dir() / f"{main._cache_key(SOURCE)}.bbcode"
+        cache_path.mkdir(parents=True)
+
+        self.assertEqual(self._run("--cache"), convert(SOURCE))
+
+    def test_cache_evicts_least_recently_used(self) -> None:
+        """Записи сверх лимита удаляются, начиная с давно не использованных."""
+
+        cache_dir = main._cache_dir()
+        cache_dir.mkdir(parents=True)
+        stale = cache_dir / "stale.bbcode"
+        stale.write_text("старое", encoding="utf-8")
+        os.utime(stale, (0, 0))
+
+        with mock.patch.object(main, "CACHE_MAX_ENTRIES", 1):
+            self._run("--cache")
+
+        cache_path = cache_dir / f"{main._cache_key(SOURCE)}.bbcode"
+        self.assertEqual(self._cache_files(), [cache_path])
+
+
+class OutputTestCase(unittest.TestCase):
+    """Проверяет чтение входа и запись результата CLI."""
+
+    def setUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.root = Path(temp_dir.name)
+
+    def _write_input(self, name: str, content: bytes) -> Path:
+        path = self.root / name
+        path.write_bytes(content)
+        return path
+
+    def test_line_endings_are_normalized(self) -> None:
+        """Файлы с CRLF и одиночными CR дают тот же результат, что и с LF."""
+
+        source = "h2. Раздел\n* Пункт\n  продолжение\n\n<pre><code>\nx\n</code></pre>\n"
+        results = []
+        for name, newline in (("lf", "\n"), ("crlf", "\r\n"), ("cr", "\r")):
+            content = source.replace("\n", newline).encode("utf-8")
+            input_path = self._write_input(f"{name}.textile", content)
+            output_path = self.root / f"{name}.bbcode"
+            argv = ["main.py", str(input_path), "-o", str(output_path)]
+            with mock.patch.object(sys, "argv", argv):
+                main.main()
+            results.append(output_path.read_bytes())
+
+        self.assertEqual(results[0], convert(source).replace("\n", os.linesep).encode("utf-8"))
+        self.assertEqual(results[1], results[0])
+        self.assertEqual(results[2], results[0])
+
+    def test_stdout_encoding_is_left_untouched(self) -> None:
+        """Вывод в stdout идёт в UTF-8, а кодировка ``sys.stdout`` не меняется."""
+
+        input_path = self._write_input("вход.textile", SOURCE.encode("utf-8"))
+        raw = io.BytesIO()
+        stdout = io.TextIOWrapper(raw, encoding="latin-1", newline="\n")
+
+        with mock.patch.object(sys, "argv", ["main.py", str(input_path)]):
+            with mock.patch.object(sys, "stdout", stdout):
+                main.main()
+                stdout.write("ok")
+                stdout.flush()
+
+        self.assertEqual(stdout.encoding, "latin-1")
+        expected = convert(SOURCE).replace("\n", os.linesep) + "ok"
+        self.assertEqual(raw.getvalue().decode("utf-8"), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
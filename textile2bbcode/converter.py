@@ -6,77 +6,95 @@ Textile-разметки в BBCode. Логика преобразования д
 """
 from __future__ import annotations
 
+import functools
 import re
+import sys
+from typing import Final, Iterator, Protocol
 
 
-CODE_BLOCK_PATTERN = re.compile(
+CODE_BLOCK_PATTERN: Final = re.compile(
     r"<pre><code(?: class=\"([^\"]+)\")?>\s*(.*?)\s*</code></pre>",
     re.IGNORECASE | re.DOTALL,
 )
-HEADING_PATTERN = re.compile(r"^h([1-6])\.\s+(.*)$")
-INLINE_CODE_PATTERN = re.compile(r"@(.*?)@")
-LIST_MARKERS = {"#": "[list=1]", "*": "[list]"}
-HEADING_SIZES = {
-    "1": "18pt",
-    "2": "16pt",
-    "3": "14pt",
-    "4": "12pt",
-    "5": "10pt",
-    "6": "8pt",
+HEADING_PATTERN: Final = re.compile(r"^h([1-6])\.\s+(.*)$")
+LIST_MARKERS: Final = {"#": sys.intern("[list=1]"), "*": sys.intern("[list]")}
+LIST_CLOSE_TAG: Final = sys.intern("[/list]")
+LIST_MARKER_PREFIXES: Final = tuple(LIST_MARKERS)
+LIST_MARKER_CHARS: Final = "".join(LIST_MARKERS)
+HEADING_WRAPS: Final = {
+    str(level): (f"[SIZE={size}][B]", "[/B][/SIZE]")
+    for level, size in enumerate(("18pt", "16pt", "14pt", "12pt", "10pt", "8pt"), start=1)
 }
+BBCODE_ESCAPE_TABLE: Final = str.maketrans({"[": "&#91;", "]": "&#93;"})
+ESCAPED_CODE_OPEN: Final = "&#91;code&#93;"
+ESCAPED_CODE_CLOSE: Final = "&#91;/code&#93;"
+LINE_WINDOW_SIZE: Final = 1 << 16
 
 
-def _replace_code_blocks(text: str) -> str:
-    """Заменяет блочные конструкции ``<pre><code>`` на BBCode.
+class TextSink(Protocol):
+    """Поток, в который ``convert_to`` пишет BBCode: подойдёт любой объект с ``write``."""
+
+    def write(self, text: str, /) -> object:
+        ...
+
+
+@functools.lru_cache(maxsize=32)
+def _code_header(language: str) -> str:
+    """Возвращает экранированный тег ``[code=язык]``; документы повторяют одни языки."""
+
+    return _escape_bbcode(f"[code={language.lower()}]")
 
-    Возвращает обновлённый текст, в котором блоки кода превращены в
-    ``[code]`` с указанием языка, если он был задан в классе ``code``.
-    """
 
-    def _to_bbcode(match: re.Match[str]) -> str:
-        language, body = match.groups()
-        language_suffix = f"={language.lower()}" if language else ""
-        cleaned_body = body.strip("\n")
-        escaped_header = _escape_bbcode(f"[code{language_suffix}]")
-        escaped_footer = _escape_bbcode("[/code]")
-        return "\n".join(["[CODE]", escaped_header, cleaned_body, escaped_footer, "[/CODE]"])
+def _code_block_to_bbcode(match: re.Match[str]) -> str:
+    """Превращает найденный блок ``<pre><code>`` в BBCode.
 
-    return CODE_BLOCK_PATTERN.sub(_to_bbcode, text)
+    Язык из класса ``code`` добавляется к экранированному тегу ``[code]``,
+    если он был задан.
+    """
+
+    language, body = match.groups()
+    escaped_header = _code_header(language) if language else ESCAPED_CODE_OPEN
+    return "\n".join(["[CODE]", escaped_header, body, ESCAPED_CODE_CLOSE, "[/CODE]"])
 
 
 def _convert_inline_code(text: str) -> str:
-    """Преобразует инлайн-конструкции ``@код@`` в BBCode ``[code]``."""
+    """Преобразует инлайн-конструкции ``@код@`` в BBCode ``[code]``.
 
-    return INLINE_CODE_PATTERN.sub(lambda m: f"[code]{m.group(1)}[/code]", text)
+    Принимает одну строку без ``\n``, поэтому ``@`` просто разбиваются на пары
+    слева направо, как нежадный шаблон ``@(.*?)@``; непарный последний ``@``
+    остаётся как есть.
+    """
+
+    if "@" not in text:
+        return text
+    parts = text.split("@")
+    tail = ""
+    if len(parts) % 2 == 0:
+        tail = f"@{parts.pop()}"
+    parts[1::2] = [f"[code]{part}[/code]" for part in parts[1::2]]
+    return "".join(parts) + tail
 
 
 def _escape_bbcode(text: str) -> str:
     """Экранирует квадратные скобки, чтобы BBCode не парсился внутри ``[CODE]``."""
 
-    return text.replace("[", "&#91;").replace("]", "&#93;")
+    return text.translate(BBCODE_ESCAPE_TABLE)
 
 
 def _start_list(marker: str) -> str:
     """Возвращает BBCode-открывающий тег для списка."""
 
-    return LIST_MARKERS.get(marker, "[list]")
-
-
-def _close_list(active: str | None) -> str | None:
-    """Возвращает закрывающий тег списка, если он активен."""
-
-    return "[/list]" if active else None
+    return LIST_MARKERS.get(marker, LIST_MARKERS["*"])
 
 
 def _convert_line(line: str) -> str:
     """Преобразует одиночную строку без учёта списков."""
 
-    heading_match = HEADING_PATTERN.match(line)
+    heading_match = HEADING_PATTERN.match(line) if line.startswith("h") else None
     if heading_match:
         level, title = heading_match.groups()
-        size = HEADING_SIZES.get(level, "12pt")
-        text = title.strip()
-        return f"[SIZE={size}][B]{text}[/B][/SIZE]"
+        opening, closing = HEADING_WRAPS[level]
+        return f"{opening}{title.strip()}{closing}"
 
     return _convert_inline_code(line)
 
@@ -85,29 +103,133 @@ def _close_list_stack(lines: list[str], stack: list[str]) -> None:
     """Закрывает все уровни вложенных списков."""
 
     while stack:
-        closing = _close_list(stack.pop())
-        if closing:
-            lines.append(closing)
+        stack.pop()
+        lines.append(LIST_CLOSE_TAG)
 
 
 def _sync_list_levels(lines: list[str], stack: list[str], markers: str) -> None:
     """Синхронизирует активные уровни списков с текущими маркерами."""
 
-    new_levels = list(markers)
+    common = 0
+    limit = min(len(stack), len(markers))
+    while common < limit and stack[common] == markers[common]:
+        common += 1
+
+    lines.extend([LIST_CLOSE_TAG] * (len(stack) - common))
+    del stack[common:]
+    for marker in markers[common:]:
+        lines.append(_start_list(marker))
+        stack.append(marker)
 
-    while len(stack) > len(new_levels):
-        closing = _close_list(stack.pop())
-        if closing:
-            lines.append(closing)
 
-    for idx, marker in enumerate(new_levels):
-        if idx >= len(stack) or stack[idx] != marker:
-            while len(stack) > idx:
-                closing = _close_list(stack.pop())
-                if closing:
-                    lines.append(closing)
-            lines.append(_start_list(marker))
-            stack.append(marker)
+def _iter_line_windows(text: str) -> Iterator[list[str]]:
+    """Выдаёт строки текста пачками, не создавая список всех строк сразу.
+
+    Текст режется на окна примерно по ``LINE_WINDOW_SIZE`` символов сразу
+    после ``\n``, и каждое окно делится через ``str.splitlines``. Поэтому
+    разделители те же, что у ``splitlines``, а ``\r\n`` не рвётся на границе.
+    """
+
+    length = len(text)
+    start = 0
+    while start < length:
+        end = text.find("\n", start + LINE_WINDOW_SIZE) + 1 or length
+        yield text[start:end].splitlines()
+        start = end
+
+
+def _iter_source_windows(text: str) -> Iterator[list[str]]:
+    """Выдаёт пачки строк текста, в котором блоки кода уже заменены на BBCode.
+
+    Блоки ищутся одним проходом по исходному буферу, а замена склеивается
+    только с соседними кусками строк, без копии всего текста.
+    """
+
+    # Шаблон регистронезависимый, поэтому проверяем только ``<``.
+    if "<" not in text:
+        yield from _iter_line_windows(text)
+        return
+
+    tail = ""
+    position = 0
+    for match in CODE_BLOCK_PATTERN.finditer(text):
+        piece = f"{tail}{text[position:match.start()]}{_code_block_to_bbcode(match)}"
+        last_newline = piece.rfind("\n")
+        yield from _iter_line_windows(piece[: last_newline + 1])
+        tail = piece[last_newline + 1 :]
+        position = match.end()
+
+    if position:
+        yield from _iter_line_windows(f"{tail}{text[position:]}")
+    else:
+        yield from _iter_line_windows(text)
+
+
+def _iter_converted_lines(text: str) -> Iterator[str]:
+    """Построчно выдаёт BBCode по мере готовности строк.
+
+    Части текущего пункта списка копятся отдельно и склеиваются один раз,
+    когда становится ясно, что строк-продолжений больше нет.
+    """
+
+    list_tags: list[str] = []
+    list_stack: list[str] = []
+    item_parts: list[str] = []
+    active_markers = ""
+
+    for window in _iter_source_windows(text):
+        for raw_line in window:
+            # Пункт списка: серия маркеров ``#``/``*``, затем хотя бы один пробел.
+            if raw_line.startswith(LIST_MARKER_PREFIXES):
+                content = raw_line.lstrip(LIST_MARKER_CHARS)
+                if content[:1].isspace():
+                    markers = raw_line[: len(raw_line) - len(content)]
+                    if item_parts:
+                        yield "\n".join(item_parts)
+                        item_parts.clear()
+                    # Соседние пункты одного уровня не требуют синхронизации стека.
+                    if markers != active_markers:
+                        _sync_list_levels(list_tags, list_stack, markers)
+                        yield from list_tags
+                        list_tags.clear()
+                        active_markers = markers
+                    item_parts.append(f"[*]{_convert_inline_code(content.strip())}")
+                    continue
+
+            if list_stack:
+                stripped = raw_line.strip()
+                if stripped:
+                    item_parts.append(_convert_inline_code(stripped))
+                    continue
+
+                yield "\n".join(item_parts)
+                item_parts.clear()
+                _close_list_stack(list_tags, list_stack)
+                yield from list_tags
+                list_tags.clear()
+                active_markers = ""
+                continue
+
+            yield _convert_line(raw_line)
+
+    if item_parts:
+        yield "\n".join(item_parts)
+    _close_list_stack(list_tags, list_stack)
+    yield from list_tags
+
+
+def convert_to(text: str, out: TextSink) -> None:
+    """Конвертирует Textile-строку в BBCode и пишет результат в поток ``out``.
+
+    Строки отправляются в поток по мере готовности, поэтому результат
+    целиком в памяти не собирается. Вывод совпадает с ``convert``.
+    """
+
+    separator = ""
+    for line in _iter_converted_lines(text):
+        out.write(separator)
+        out.write(line)
+        separator = "\n"
 
 
 def convert(text: str) -> str:
@@ -123,32 +245,7 @@ def convert(text: str) -> str:
     Остальной текст остаётся без изменений.
     """
 
-    text = _replace_code_blocks(text)
-    converted_lines: list[str] = []
-    list_stack: list[str] = []
-
-    for raw_line in text.splitlines():
-        list_match = re.match(r"^([#*]+)\s+(.*)$", raw_line)
-        if list_match:
-            markers, content = list_match.groups()
-            _sync_list_levels(converted_lines, list_stack, markers)
-            converted_lines.append(f"[*]{_convert_inline_code(content.strip())}")
-            continue
-
-        if list_stack and raw_line.strip():
-            converted_lines[-1] = "\n".join(
-                [converted_lines[-1], _convert_inline_code(raw_line.strip())]
-            )
-            continue
-
-        if list_stack and not raw_line.strip():
-            _close_list_stack(converted_lines, list_stack)
-            continue
-
-        converted_lines.append(_convert_line(raw_line))
-
-    _close_list_stack(converted_lines, list_stack)
-    return "\n".join(filter(lambda line: line is not None, converted_lines))
+    return "\n".join(_iter_converted_lines(text))
 
 
-__all__ = ["convert"]
+__all__ = ["TextSink", "convert", "convert_to"]